@@ -0,0 +1,97 @@
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import invoice_store
+from bench_invoice_store import make_record
+from invoice_export import EXPORT_FORMATS, EXPORT_ROW_LIMITS, format_available
+
+BENCH_OWNER = 'bench'
+
+
+def populate(db_path, rows, batch):
+    rng = random.Random(0)
+    for offset in range(0, rows, batch):
+        invoice_store.save_invoices(
+            ((make_record(i, rng)[0], f'{i:064x}') for i in range(offset, min(offset + batch, rows))),
+            BENCH_OWNER, db_path=db_path,
+        )
+
+
+def run_export(export_format, db_path):
+    # Returns (bytes, seconds until the first byte); the first byte is what
+    # the client and the gunicorn timeout wait on before anything is sent
+    exporter = EXPORT_FORMATS[export_format][0]
+    start = time.perf_counter()
+    size = 0
+    first_byte = None
+    for chunk in exporter(invoice_store.iter_invoice_rows(BENCH_OWNER, db_path=db_path)):
+        if chunk and first_byte is None:
+            first_byte = time.perf_counter() - start
+        size += len(chunk)
+    return size, first_byte
+
+
+def measure(export_format, db_path):
+    # Runs in a fresh interpreter per format, so ru_maxrss covers only that
+    # export. ru_maxrss includes native allocations (Arrow buffers, openpyxl's
+    # lxml state) that tracemalloc cannot see.
+    start = time.perf_counter()
+    size, first_byte = run_export(export_format, db_path)
+    elapsed = time.perf_counter() - start
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024  # KiB on Linux
+
+    # Separate pass: tracemalloc slows allocation-heavy code down a lot
+    tracemalloc.start()
+    run_export(export_format, db_path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'elapsed': elapsed, 'first_byte': first_byte, 'size': size, 'max_rss': max_rss, 'heap_peak': peak}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rows/s and peak memory of the streaming exporters')
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--batch', type=int, default=50_000)
+    parser.add_argument('--formats', default=','.join(EXPORT_FORMATS))
+    parser.add_argument('--measure', nargs=2, metavar=('FORMAT', 'DB'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(*args.measure)))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bench.db')
+        populate(db_path, args.rows, args.batch)
+        print(f'exporting {args.rows} rows')
+
+        for export_format in args.formats.split(','):
+            if not format_available(export_format):
+                print(f'{export_format:<8} skipped ({EXPORT_FORMATS[export_format][2]} not installed)')
+                continue
+            row_limit = EXPORT_ROW_LIMITS.get(export_format)
+            if row_limit is not None and args.rows > row_limit:
+                print(f'{export_format:<8} skipped (capped at {row_limit} rows; use --rows {row_limit})')
+                continue
+            output = subprocess.run(
+                [sys.executable, __file__, '--measure', export_format, db_path],
+                check=True, capture_output=True, text=True,
+            ).stdout
+            result = json.loads(output)
+            print(f"{export_format:<8} {args.rows / result['elapsed']:>10,.0f} rows/s  "
+                  f"{result['first_byte']:7.2f} s to first byte  "
+                  f"{result['size'] / 1e6:8.1f} MB output  "
+                  f"{result['max_rss'] / 1e6:6.1f} MB max RSS  "
+                  f"{result['heap_peak'] / 1e6:6.1f} MB peak Python heap")
+
+
+if __name__ == '__main__':
+    main()
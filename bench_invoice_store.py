@@ -0,0 +1,102 @@
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import invoice_store
+
+BENCH_OWNER = 'bench'
+
+
+def make_record(i, rng):
+    vendor = f'Vendor {rng.randrange(5000)} Company'
+    return {
+        'Invoice Number': f'INV-{i:08d}',
+        'Invoice Date': f'2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}',
+        'Vendor Name': vendor,
+        'Vendor Address': f'{rng.randrange(1000)} Moi Avenue, Nairobi',
+        'Total Amount': f'{rng.uniform(10, 100000):.2f}',
+        'Tax Amount': '',
+        'Subtotal': '',
+        'Due Date': '',
+        'Purchase Order': f'PO-{rng.randrange(100000)}',
+        'Description': 'Office supplies',
+    }, vendor
+
+
+def timed_queries(label, count, query, expect_hits=False):
+    hits = 0
+    start = time.perf_counter()
+    for _ in range(count):
+        records, _ = query()
+        hits += bool(records)
+    elapsed = time.perf_counter() - start
+    note = f'  ({hits}/{count} hits)' if expect_hits else ''
+    print(f'{label:<36} {elapsed / count * 1000:8.3f} ms/query{note}')
+
+
+def timed_pages(label, pages, db_path, **filters):
+    # Walk `pages` consecutive pages of one result set
+    cursor = None
+    walked = 0
+    start = time.perf_counter()
+    while walked < pages:
+        records, cursor = invoice_store.query_invoices(
+            BENCH_OWNER, after=cursor, limit=100, db_path=db_path, **filters)
+        walked += 1
+        if cursor is None:
+            break
+    elapsed = time.perf_counter() - start
+    print(f'{label:<36} {elapsed / walked * 1000:8.3f} ms/page  ({walked} pages)')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Insert and query benchmark for invoice_store')
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--batch', type=int, default=50_000)
+    parser.add_argument('--queries', type=int, default=1000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bench.db')
+        stored = []
+
+        start = time.perf_counter()
+        for offset in range(0, args.rows, args.batch):
+            batch = []
+            for i in range(offset, min(offset + args.batch, args.rows)):
+                record, vendor = make_record(i, rng)
+                batch.append((record, f'{i:064x}'))
+                if i % 100 == 0:
+                    stored.append((record['Invoice Number'], vendor))
+            invoice_store.save_invoices(batch, BENCH_OWNER, db_path=db_path)
+        elapsed = time.perf_counter() - start
+        print(f'inserted {args.rows} rows in {elapsed:.2f} s ({args.rows / elapsed:,.0f} rows/s)')
+
+        def query(**filters):
+            return lambda: invoice_store.query_invoices(BENCH_OWNER, db_path=db_path, **filters)
+
+        def seen_before():
+            number, vendor = rng.choice(stored)
+            return invoice_store.query_invoices(BENCH_OWNER, invoice_number=number, vendor=vendor, db_path=db_path)
+
+        timed_queries('invoice number + vendor (hit)', args.queries, seen_before, expect_hits=True)
+        timed_queries('invoice number + vendor (miss)', args.queries, lambda: invoice_store.query_invoices(
+            BENCH_OWNER, invoice_number='INV-MISSING', vendor=rng.choice(stored)[1], db_path=db_path))
+        timed_queries('vendor, first page', args.queries, lambda: invoice_store.query_invoices(
+            BENCH_OWNER, vendor=rng.choice(stored)[1], db_path=db_path), expect_hits=True)
+        timed_queries('narrow amount range, first page', args.queries, query(min_amount=5000, max_amount=5100))
+        timed_queries('wide amount range, first page', args.queries, query(min_amount=1000, max_amount=90000))
+        timed_queries('single day, first page', args.queries, query(date_from='2025-06-15', date_to='2025-06-15'))
+        timed_queries('full year, first page', args.queries, query(date_from='2025-01-01', date_to='2025-12-31'))
+
+        timed_pages('unfiltered pagination (100 rows)', args.queries, db_path)
+        timed_pages('wide amount pagination (100 rows)', args.queries, db_path, min_amount=1000, max_amount=90000)
+        timed_pages('full year pagination (100 rows)', args.queries, db_path,
+                    date_from='2025-01-01', date_to='2025-12-31')
+
+
+if __name__ == '__main__':
+    main()
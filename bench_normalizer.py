@@ -0,0 +1,74 @@
+import argparse
+import random
+import time
+
+import invoice_normalizer
+
+AMOUNT_FORMATS = ['KES {:,.2f}', '{:,.2f}', '$ {:.2f}']
+DATE_FORMATS = ['%d/%m/%y', '%Y-%m-%d', '%d %B %Y', '%d-%b-%y']
+
+
+def make_records(count, vendors, rng):
+    # Vendors repeat their amount and date formats, but every invoice has its
+    # own totals and one of ~365 dates, as in a real year of invoices
+    formats = [(rng.choice(AMOUNT_FORMATS), rng.choice(DATE_FORMATS)) for _ in range(vendors)]
+    records = []
+    for _ in range(count):
+        amount_format, date_format = rng.choice(formats)
+        subtotal = round(rng.uniform(100, 50000), 2)
+        tax = round(subtotal * 0.16, 2)
+        invoice_date = time.struct_time((2025, rng.randint(1, 12), rng.randint(1, 28), 0, 0, 0, 0, 1, -1))
+        records.append({
+            'Subtotal': amount_format.format(subtotal),
+            'Tax Amount': amount_format.format(tax),
+            'Total Amount': amount_format.format(subtotal + tax),
+            'Invoice Date': time.strftime(date_format, invoice_date),
+            'Due Date': time.strftime(date_format, invoice_date),
+        })
+    return records
+
+
+def per_record_loop(records):
+    # Baseline: parse every field of every record individually
+    for record in records:
+        for field in invoice_normalizer.AMOUNT_FIELDS:
+            invoice_normalizer.parse_amount(str(record.get(field) or ''))
+        for field in invoice_normalizer.DATE_FIELDS:
+            invoice_normalizer.parse_date(str(record.get(field) or ''))
+
+
+def columnar(records):
+    raw = invoice_normalizer.to_columns(records)
+    columns = invoice_normalizer.normalize(raw)
+    invoice_normalizer.validate(raw, columns)
+
+
+def bench(label, func, records, repeat):
+    best = min(_timed(func, records) for _ in range(repeat))
+    print(f'{label:<28} {len(records) / best:>12,.0f} records/s')
+
+
+def _timed(func, records):
+    start = time.perf_counter()
+    func(records)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Throughput of batch amount/date normalization')
+    parser.add_argument('--records', type=int, default=100_000)
+    parser.add_argument('--vendors', type=int, default=2_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    records = make_records(args.records, args.vendors, random.Random(0))
+    print(f'{args.records} records, {args.vendors} distinct vendors')
+    bench('per-record loop', per_record_loop, records, args.repeat)
+    bench('columnar normalize+validate', columnar, records, args.repeat)
+    if invoice_normalizer.HAS_PYARROW:
+        invoice_normalizer.HAS_PYARROW = False
+        bench('  without pyarrow', columnar, records, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,9 @@
+# Loaded automatically when gunicorn is started from this directory.
+# Sync workers must finish a whole response inside the timeout, so it has to
+# cover the largest export: XLSX_MAX_ROWS rows of XLSX at ~5k rows/s is about
+# 20 s, and CSV/Parquet stream 1M rows in well under a minute.
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('GUNICORN_WORKERS', 2))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
@@ -0,0 +1,139 @@
+import csv
+import importlib.util
+import io
+import os
+import tempfile
+
+from invoice_store import STANDARD_FIELDS
+
+# Spooled files stay in memory up to this size, then move to disk
+SPOOL_MAX_SIZE = 8 * 1024 * 1024
+READ_CHUNK_SIZE = 256 * 1024
+
+# An XLSX body cannot start until the whole workbook is built, at roughly
+# 5k rows/s, so larger exports are refused up front instead of running past
+# the gunicorn timeout. Excel itself stops at 1,048,576 rows per sheet.
+XLSX_SHEET_ROWS = 1_048_576
+XLSX_MAX_ROWS = min(int(os.environ.get('XLSX_MAX_ROWS', 100_000)), XLSX_SHEET_ROWS - 1)
+
+# Spreadsheet apps evaluate cells starting with these as formulas, and the
+# exported values are OCR text anyone can influence
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _drain(spool):
+    spool.seek(0)
+    while True:
+        chunk = spool.read(READ_CHUNK_SIZE)
+        if not chunk:
+            return
+        yield chunk
+
+
+class _ChunkSink(io.RawIOBase):
+    # Write-only file that keeps what was written since the last take(), so
+    # a writer's output can be yielded as it is produced.
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def take(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _csv_safe(value):
+    # A leading apostrophe makes spreadsheet apps show the value as text
+    return "'" + value if value.startswith(FORMULA_PREFIXES) else value
+
+
+def export_csv(batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(STANDARD_FIELDS)
+    for rows in batches:
+        writer.writerows([_csv_safe(value) for value in row] for row in rows)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def export_xlsx(batches):
+    # XLSX is a zip archive, so it cannot be emitted until the workbook is
+    # closed. A write-only workbook keeps rows out of memory while it is built.
+    # Callers check the row count against XLSX_MAX_ROWS first; the guard below
+    # only catches rows added since.
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+
+    def text_cell(value):
+        # openpyxl turns strings starting with '=' into live formulas; every
+        # other string is already written as text
+        if not value.startswith('='):
+            return value
+        cell = WriteOnlyCell(sheet, value=value)
+        cell.data_type = 's'
+        return cell
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Invoices')
+    sheet.append(STANDARD_FIELDS)
+    written = 0
+    for rows in batches:
+        written += len(rows)
+        if written > XLSX_MAX_ROWS:
+            sheet.close()  # releases the sheet's temporary file
+            raise ValueError(f'XLSX export is limited to {XLSX_MAX_ROWS} rows')
+        for row in rows:
+            sheet.append([text_cell(value) for value in row])
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE) as spool:
+        workbook.save(spool)
+        yield from _drain(spool)
+
+
+def export_parquet(batches):
+    # Each batch becomes one row group and is sent as soon as it is written;
+    # the footer only needs offsets, so it follows the last row group.
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([(field, pa.string()) for field in STANDARD_FIELDS])
+    sink = _ChunkSink()
+    with pq.ParquetWriter(sink, schema, compression='snappy') as writer:
+        for rows in batches:
+            columns = [list(column) for column in zip(*rows)]
+            writer.write_batch(pa.RecordBatch.from_arrays(
+                [pa.array(column, pa.string()) for column in columns], schema=schema))
+            yield sink.take()
+    yield sink.take()
+
+
+# format -> maximum rows, for formats that cannot stream
+EXPORT_ROW_LIMITS = {'xlsx': XLSX_MAX_ROWS}
+
+# format -> (generator, mimetype, optional dependency)
+EXPORT_FORMATS = {
+    'csv': (export_csv, 'text/csv', None),
+    'xlsx': (export_xlsx, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'openpyxl'),
+    'parquet': (export_parquet, 'application/vnd.apache.parquet', 'pyarrow'),
+}
+
+
+def format_available(export_format):
+    dependency = EXPORT_FORMATS[export_format][2]
+    return dependency is None or importlib.util.find_spec(dependency) is not None
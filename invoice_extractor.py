@@ -1,11 +1,18 @@
 import React, { useState, useRef, useEffect } from 'react';
 import { Upload, FileText, CheckCircle, AlertCircle, Download, Settings, Eye, Send, CreditCard, Smartphone, AlertTriangle, Clock, Shield } from 'lucide-react';
 
+const API_BASE = 'https://your-app.onrender.com';
+const RESUMABLE_THRESHOLD = 2 * 1024 * 1024; // Use chunked uploads above 2 MB
+const UPLOAD_CHUNK_SIZE = 512 * 1024;
+const MAX_CHUNK_RETRIES = 5;
+
 const InvoiceExtractor = () => {
   const [currentStep, setCurrentStep] = useState('upload');
   const [uploadedFile, setUploadedFile] = useState(null);
   const [extractedText, setExtractedText] = useState('');
-  const [extractedData, setExtractedData] = useState(null);
+  const [extractedRecords, setExtractedRecords] = useState([]);
+  const [activeRecord, setActiveRecord] = useState(0);
+  const [sourceHash, setSourceHash] = useState('');
   const [isProcessing, setIsProcessing] = useState(false);
   const [error, setError] = useState('');
   const [googleSheetsUrl, setGoogleSheetsUrl] = useState('');
@@ -16,7 +23,14 @@ const InvoiceExtractor = () => {
   const [phoneNumber, setPhoneNumber] = useState('');
   const [paymentAmount, setPaymentAmount] = useState(50); // KES 50 per invoice
   const [errorLogs, setErrorLogs] = useState([]);
-  const [userId] = useState(() => 'user_' + Math.random().toString(36).substr(2, 9));
+  // Kept in localStorage so stored invoices (scoped to this id) survive reloads
+  const [userId] = useState(() => {
+    const savedId = localStorage.getItem('user_id');
+    if (savedId) return savedId;
+    const newId = 'user_' + Math.random().toString(36).substr(2, 9);
+    localStorage.setItem('user_id', newId);
+    return newId;
+  });
   const fileInputRef = useRef(null);
 
   // Standard invoice fields that will be mapped to Google Sheets columns
@@ -214,6 +228,71 @@ const InvoiceExtractor = () => {
     e.preventDefault();
   };
 
+  // Resumable chunked upload for large scans: a dropped connection only
+  // costs the chunk in flight, the next attempt resumes at the committed offset.
+  const uploadResumable = async (file) => {
+    const digest = await crypto.subtle.digest('SHA-256', await file.arrayBuffer());
+    const sha256 = Array.from(new Uint8Array(digest)).map(b => b.toString(16).padStart(2, '0')).join('');
+
+    const createResponse = await fetch(`${API_BASE}/api/uploads`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ filename: file.name, size: file.size, sha256 })
+    });
+    const upload = await createResponse.json();
+    if (!createResponse.ok) {
+      throw new Error(upload.error || 'Could not start upload');
+    }
+
+    let offset = 0;
+    let failures = 0;
+    while (offset < file.size) {
+      try {
+        const chunkResponse = await fetch(`${API_BASE}/api/uploads/${upload.upload_id}`, {
+          method: 'PUT',
+          headers: { 'Upload-Offset': offset.toString() },
+          body: file.slice(offset, offset + UPLOAD_CHUNK_SIZE)
+        });
+        const status = await chunkResponse.json();
+        if (!chunkResponse.ok && chunkResponse.status !== 409) {
+          throw new Error(status.error || 'Chunk upload failed');
+        }
+        if (typeof status.offset !== 'number') {
+          throw new Error('Upload server did not report an offset');
+        }
+        offset = status.offset;
+        failures = 0;
+      } catch (err) {
+        failures++;
+        if (failures > MAX_CHUNK_RETRIES) {
+          throw err;
+        }
+        logError(err, `Chunk upload retry ${failures}/${MAX_CHUNK_RETRIES}`, 'warning');
+        await new Promise(resolve => setTimeout(resolve, 1000 * failures));
+        // Ask the server how much it actually committed before resuming. If the
+        // link is still down, the next attempt retries from the last known offset.
+        try {
+          const statusResponse = await fetch(`${API_BASE}/api/uploads/${upload.upload_id}`);
+          const status = await statusResponse.json();
+          if (statusResponse.ok && typeof status.offset === 'number') {
+            offset = status.offset;
+          }
+        } catch (statusErr) {
+          logError(statusErr, 'Upload status check', 'warning');
+        }
+      }
+    }
+
+    const finalizeResponse = await fetch(`${API_BASE}/api/uploads/${upload.upload_id}/finalize`, {
+      method: 'POST'
+    });
+    const data = await finalizeResponse.json();
+    if (!finalizeResponse.ok) {
+      throw new Error(data.error || 'Upload finalization failed');
+    }
+    return data;
+  };
+
   const processFile = async (file) => {
     setIsProcessing(true);
     try {
@@ -222,16 +301,24 @@ const InvoiceExtractor = () => {
       
       // Check if it's an image file for OCR processing
       if (file.type.startsWith('image/') || file.type === 'application/pdf') {
-        const formData = new FormData();
-        formData.append('file', file);
-
-        const response = await fetch('https://your-app.onrender.com/api/ocr', {
-          method: 'POST',
-          body: formData,
-        });
-        const data = await response.json();
+        let data;
+        if (file.size > RESUMABLE_THRESHOLD) {
+          data = await uploadResumable(file);
+        } else {
+          const formData = new FormData();
+          formData.append('file', file);
+
+          const response = await fetch(`${API_BASE}/api/ocr`, {
+            method: 'POST',
+            body: formData,
+          });
+          data = await response.json();
+        }
         setExtractedText(data.text);
-        await extractStructuredData(data.text);
+        setSourceHash(data.sha256 || '');
+        // Multi-invoice PDFs come back split into one segment per invoice
+        const segments = data.invoices?.length ? data.invoices : [{ text: data.text }];
+        await extractStructuredData(segments);
       } else {
         throw new Error('Unsupported file type. Please upload PDF or image files.');
       }
@@ -245,7 +332,7 @@ const InvoiceExtractor = () => {
     }
   };
 
-  const extractStructuredData = async (text) => {
+  const extractFields = async (text) => {
     try {
       // Use Claude API to extract structured data
       const prompt = `
@@ -270,19 +357,55 @@ const InvoiceExtractor = () => {
       `;
 
       const response = await window.claude.complete(prompt);
-      const parsedData = JSON.parse(response);
-      
-      setExtractedData(parsedData);
-      setCurrentStep('review');
-      setIsProcessing(false);
+      return JSON.parse(response);
     } catch (err) {
       logError(err, 'Data extraction via Claude API', 'warning');
       console.error('Error extracting data:', err);
       // Fallback to manual parsing if Claude API fails
-      const fallbackData = manualExtraction(text);
-      setExtractedData(fallbackData);
-      setCurrentStep('review');
-      setIsProcessing(false);
+      return manualExtraction(text);
+    }
+  };
+
+  const extractStructuredData = async (segments) => {
+    // Each invoice is extracted independently, so all segments run in parallel
+    // and the whole stack takes about as long as its slowest invoice.
+    const records = await Promise.all(segments.map(segment => extractFields(segment.text)));
+    const issues = await validateRecords(records);
+    setExtractedRecords(records.map((record, index) => ({
+      ...record,
+      _pages: segments[index].first_page ? [segments[index].first_page, segments[index].last_page] : null,
+      _issues: issues[index] || []
+    })));
+    setActiveRecord(0);
+    setCurrentStep('review');
+    setIsProcessing(false);
+  };
+
+  const ISSUE_MESSAGES = {
+    unparsed_amount: 'An amount could not be read as a number',
+    unparsed_date: 'A date could not be recognised',
+    subtotal_tax_total_mismatch: 'Subtotal + Tax does not equal Total',
+    tax_exceeds_total: 'Tax Amount is larger than Total Amount',
+    negative_total: 'Total Amount is negative',
+    due_before_invoice_date: 'Due Date is before Invoice Date'
+  };
+
+  const validateRecords = async (records) => {
+    // Cross-field checks run server-side over the whole batch at once
+    try {
+      const response = await fetch(`${API_BASE}/api/invoices/validate`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ records })
+      });
+      const data = await response.json();
+      if (!response.ok) {
+        throw new Error(data.error || 'Validation failed');
+      }
+      return data.results.map(result => result.issues);
+    } catch (err) {
+      logError(err, 'Invoice validation', 'warning');
+      return [];
     }
   };
 
@@ -312,11 +435,12 @@ const InvoiceExtractor = () => {
     }
   };
 
+  const extractedData = extractedRecords[activeRecord] || null;
+
   const handleFieldChange = (field, value) => {
-    setExtractedData(prev => ({
-      ...prev,
-      [field]: value
-    }));
+    setExtractedRecords(prev => prev.map((record, index) => (
+      index === activeRecord ? { ...record, [field]: value } : record
+    )));
   };
 
   const sendToGoogleSheets = async () => {
@@ -327,6 +451,18 @@ const InvoiceExtractor = () => {
 
     setIsProcessing(true);
     try {
+      // Persist the reviewed records so they can be looked up later without reprocessing
+      await Promise.all(extractedRecords.map(async ({ _pages, _issues, ...record }) => {
+        const saveResponse = await fetch(`${API_BASE}/api/invoices`, {
+          method: 'POST',
+          headers: { 'Content-Type': 'application/json', 'X-User-Id': userId },
+          body: JSON.stringify({ record, source_hash: sourceHash })
+        });
+        if (!saveResponse.ok) {
+          logError({message: (await saveResponse.json()).error || 'Failed to store invoice'}, 'Invoice store', 'warning');
+        }
+      }));
+
       // Simulate sending to Google Sheets
       await new Promise(resolve => setTimeout(resolve, 2000));
       
@@ -348,7 +484,9 @@ const InvoiceExtractor = () => {
     setCurrentStep('upload');
     setUploadedFile(null);
     setExtractedText('');
-    setExtractedData(null);
+    setSourceHash('');
+    setExtractedRecords([]);
+    setActiveRecord(0);
     setError('');
     setSuccessMessage('');
     if (fileInputRef.current) {
@@ -563,6 +701,37 @@ const InvoiceExtractor = () => {
           </button>
         </div>
       </div>
+
+      {extractedRecords.length > 1 && (
+        <div className="flex flex-wrap gap-2">
+          {extractedRecords.map((record, index) => (
+            <button
+              key={index}
+              onClick={() => setActiveRecord(index)}
+              className={`px-3 py-1 rounded-md text-sm border ${
+                index === activeRecord ? 'bg-blue-600 text-white border-blue-600' : 'border-gray-300 hover:bg-gray-50'
+              }`}
+            >
+              Invoice {index + 1}
+              {record._pages && ` (p. ${record._pages[0]}${record._pages[1] !== record._pages[0] ? `-${record._pages[1]}` : ''})`}
+            </button>
+          ))}
+        </div>
+      )}
+
+      {extractedData?._issues?.length > 0 && (
+        <div className="p-4 bg-yellow-50 border border-yellow-200 rounded-md">
+          <div className="flex items-center gap-2 mb-1">
+            <AlertTriangle className="h-5 w-5 text-yellow-600" />
+            <span className="font-medium text-yellow-800">Please double-check these fields</span>
+          </div>
+          <ul className="text-sm text-yellow-700 list-disc ml-9">
+            {extractedData._issues.map(issue => (
+              <li key={issue}>{ISSUE_MESSAGES[issue] || issue}</li>
+            ))}
+          </ul>
+        </div>
+      )}
       
       <div className="grid grid-cols-1 md:grid-cols-2 gap-4">
         {standardFields.map(field => (
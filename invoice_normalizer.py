@@ -0,0 +1,262 @@
+import datetime
+import importlib.util
+import re
+
+import numpy as np
+
+# pyarrow is optional here; without it every amount takes the parse_amount path
+HAS_PYARROW = importlib.util.find_spec('pyarrow') is not None
+
+AMOUNT_FIELDS = ['Subtotal', 'Tax Amount', 'Total Amount']
+DATE_FIELDS = ['Invoice Date', 'Due Date']
+
+# Absolute tolerance for subtotal + tax == total, to absorb per-line rounding
+AMOUNT_TOLERANCE = 0.011
+
+CURRENCY_RE = re.compile(r'\b(KES|KSH|USD|EUR|GBP|UGX|TZS|RWF|ZAR|NGN|INR)(?![A-Za-z])|(\$|€|£|₹)', re.I)
+CURRENCY_SYMBOLS = {'$': 'USD', '€': 'EUR', '£': 'GBP', '₹': 'INR'}
+NUMBER_RE = re.compile(r"\d(?:[\d.,'’  ]*\d)?")
+# A sign counts only when it sits right before the number, optionally with a
+# currency in between ("-1,250", "KES -1,250", "-$12"), or when the number is
+# wrapped in parentheses ("(45.00)", "(KES 45.00)")
+_CURRENCY_CODES = r'KES|KSH|USD|EUR|GBP|UGX|TZS|RWF|ZAR|NGN|INR'
+_CURRENCY_TOKEN = rf'(?:{_CURRENCY_CODES}|\$|€|£|₹)'
+MINUS_PREFIX_RE = re.compile(rf'-\s*(?:{_CURRENCY_TOKEN}\s*)?$', re.I)
+PAREN_PREFIX_RE = re.compile(rf'\(\s*(?:{_CURRENCY_TOKEN}\s*)?$', re.I)
+PAREN_SUFFIX_RE = re.compile(rf'^\s*(?:{_CURRENCY_TOKEN}\s*)?\)', re.I)
+
+# The usual shape of an extracted amount: optional sign and currency code or
+# symbol, then plain digits or comma-grouped thousands with a dot decimal.
+# Columns are matched against it in bulk; anything else goes to parse_amount.
+# For these strings the two produce the same value and currency; a trailing
+# code needs a space first, as CURRENCY_RE does not see "1,250KES".
+SIMPLE_AMOUNT_PATTERN = (
+    rf'(?i)^\s*(?P<minus>-?)\s*(?P<before>{_CURRENCY_TOKEN}?)\s*(?P<sign>-?)\s*'
+    r'(?P<number>\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:\.\d+)?)'
+    rf'(?P<after>(?:\s*[$€£₹]|\s+(?:{_CURRENCY_CODES}))?)\s*$'
+)
+
+ISO_DATE_RE = re.compile(r'\b(\d{4})[-/.](\d{1,2})[-/.](\d{1,2})\b')
+NUMERIC_DATE_RE = re.compile(r'\b(\d{1,2})[-/.](\d{1,2})[-/.](\d{4}|\d{2})\b')
+DAY_MONTH_NAME_RE = re.compile(r'\b(\d{1,2})(?:st|nd|rd|th)?[\s-]+([A-Za-z]{3,9})\.?,?[\s-]+(\d{4}|\d{2})\b')
+MONTH_NAME_DAY_RE = re.compile(r'\b([A-Za-z]{3,9})\.?\s+(\d{1,2})(?:st|nd|rd|th)?,?\s+(\d{4}|\d{2})\b')
+MONTHS = {name: index for index, name in enumerate(
+    ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec'], start=1)}
+
+# Validation flags, in column order of the boolean matrix returned by validate()
+CHECKS = [
+    'unparsed_amount',
+    'unparsed_date',
+    'subtotal_tax_total_mismatch',
+    'tax_exceeds_total',
+    'negative_total',
+    'due_before_invoice_date',
+]
+
+
+def _number_from_digits(digits):
+    digits = re.sub(r"['’  ]", '', digits)
+    last_comma = digits.rfind(',')
+    last_dot = digits.rfind('.')
+    if last_comma >= 0 and last_dot >= 0:
+        # Both present: whichever comes last is the decimal separator ("1.250,00", "1,250.00")
+        decimal = ',' if last_comma > last_dot else '.'
+    elif last_comma >= 0 or last_dot >= 0:
+        separator = ',' if last_comma >= 0 else '.'
+        groups = digits.split(separator)
+        # "1,250" and "1.250.000" are thousands groups; "1250,5" and "12.50" are decimals.
+        # A lone "1.250" stays a decimal, matching the English formatting most invoices use.
+        if all(len(group) == 3 for group in groups[1:]) and (separator == ',' or len(groups) > 2):
+            decimal = None
+        else:
+            decimal = separator
+    else:
+        decimal = None
+
+    if decimal is None:
+        return float(digits.replace(',', '').replace('.', ''))
+    thousands = '.' if decimal == ',' else ','
+    whole, _, fraction = digits.replace(thousands, '').rpartition(decimal)
+    if decimal in whole:
+        return None
+    return float(f'{whole or 0}.{fraction}')
+
+
+def parse_amount(text):
+    # "KES 1,250.00" -> (1250.0, 'KES'); unparseable -> (nan, '')
+    currency_match = CURRENCY_RE.search(text)
+    currency = ''
+    if currency_match:
+        currency = (currency_match.group(1) or CURRENCY_SYMBOLS[currency_match.group(2)]).upper()
+        currency = 'KES' if currency == 'KSH' else currency
+    number_match = NUMBER_RE.search(text)
+    if not number_match:
+        return np.nan, currency
+    value = _number_from_digits(number_match.group(0))
+    if value is None:
+        return np.nan, currency
+    prefix = text[:number_match.start()]
+    suffix = text[number_match.end():]
+    negative = bool(MINUS_PREFIX_RE.search(prefix)) or (
+        bool(PAREN_PREFIX_RE.search(prefix)) and bool(PAREN_SUFFIX_RE.match(suffix)))
+    return (-value if negative else value), currency
+
+
+def _make_date(year, month, day):
+    year = int(year)
+    if year < 100:
+        year += 2000 if year < 70 else 1900
+    try:
+        return np.datetime64(datetime.date(year, int(month), int(day)), 'D')
+    except ValueError:
+        return np.datetime64('NaT', 'D')
+
+
+def parse_date(text, day_first=True):
+    match = ISO_DATE_RE.search(text)
+    if match:
+        return _make_date(*match.groups())
+    match = NUMERIC_DATE_RE.search(text)
+    if match:
+        first, second, year = (int(part) for part in match.groups())
+        if first > 12 or (day_first and second <= 12):
+            return _make_date(year, second, first)
+        return _make_date(year, first, second)
+    match = DAY_MONTH_NAME_RE.search(text)
+    if match and match.group(2)[:3].lower() in MONTHS:
+        return _make_date(match.group(3), MONTHS[match.group(2)[:3].lower()], match.group(1))
+    match = MONTH_NAME_DAY_RE.search(text)
+    if match and match.group(1)[:3].lower() in MONTHS:
+        return _make_date(match.group(3), MONTHS[match.group(1)[:3].lower()], match.group(2))
+    return np.datetime64('NaT', 'D')
+
+
+def to_columns(records):
+    # Pivot record dicts into one string array per amount and date field
+    return {
+        field: np.array([str(record.get(field) or '').strip() for record in records], dtype=str)
+        for field in AMOUNT_FIELDS + DATE_FIELDS
+    }
+
+
+def _parse_simple_amounts(column):
+    # Column-wise parse of the strings matching SIMPLE_AMOUNT_PATTERN, using
+    # Arrow's compute kernels. Returns (matched mask, values, currencies).
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    parts = pc.extract_regex(pa.array(column), SIMPLE_AMOUNT_PATTERN)
+    matched = pc.is_valid(parts).to_numpy(zero_copy_only=False)
+    parts = parts.filter(pc.is_valid(parts))
+    number = pc.replace_substring(parts.field('number'), ',', '')
+    values = pc.cast(number, pa.float64())
+    negative = pc.or_(pc.equal(parts.field('minus'), '-'), pc.equal(parts.field('sign'), '-'))
+    values = pc.if_else(negative, pc.negate(values), values).to_numpy(zero_copy_only=False)
+    currencies = pc.utf8_upper(pc.utf8_trim_whitespace(pc.if_else(
+        pc.equal(parts.field('before'), ''), parts.field('after'), parts.field('before'))))
+    for token, code in [('KSH', 'KES'), *CURRENCY_SYMBOLS.items()]:
+        currencies = pc.replace_substring(currencies, token, code)
+    return matched, values, np.array(currencies.to_pylist(), dtype=str)
+
+
+def parse_amount_column(column):
+    """Parse a string array of amounts into (float64 values, currency codes).
+
+    Matches parse_amount() element for element. With pyarrow installed the
+    common formats are parsed column-wise and only the rest one at a time.
+    """
+    values = np.full(len(column), np.nan)
+    currencies = np.full(len(column), '', dtype='<U3')
+    remaining = np.ones(len(column), dtype=bool)
+    if len(column) and HAS_PYARROW:
+        matched, simple_values, simple_currencies = _parse_simple_amounts(column)
+        values[matched] = simple_values
+        currencies[matched] = simple_currencies
+        remaining = ~matched
+    if remaining.any():
+        parsed, inverse = _parse_unique(column[remaining], parse_amount)
+        values[remaining] = np.array([value for value, _ in parsed], dtype=np.float64)[inverse]
+        currencies[remaining] = np.array([currency for _, currency in parsed], dtype=str)[inverse]
+    return values, currencies
+
+
+def _parse_unique(column, parse_one):
+    # Dates repeat heavily across a batch (a few hundred distinct days), so
+    # each distinct string is parsed once and the results are broadcast back
+    # with the inverse index. Amounts are mostly distinct and only reach here
+    # when they miss SIMPLE_AMOUNT_PATTERN.
+    uniques, inverse = np.unique(column, return_inverse=True)
+    return [parse_one(value) for value in uniques], inverse
+
+
+def normalize(raw, day_first=True):
+    """Parse the raw string columns returned by to_columns().
+
+    Returns a dict of columns: a float64 array per amount field (NaN when
+    empty or unparseable), a '<field> Currency' string array per amount
+    field, and a datetime64[D] array per date field (NaT when missing).
+    """
+    columns = {}
+    for field in AMOUNT_FIELDS:
+        columns[field], columns[f'{field} Currency'] = parse_amount_column(raw[field])
+    for field in DATE_FIELDS:
+        parsed, inverse = _parse_unique(raw[field], lambda text: parse_date(text, day_first))
+        values = np.array(parsed, dtype='datetime64[D]')
+        columns[field] = values[inverse] if len(parsed) else np.empty(0, dtype='datetime64[D]')
+    return columns
+
+
+def validate(raw, columns):
+    """Run cross-field checks over normalized columns.
+
+    Returns a boolean matrix of shape (rows, len(CHECKS)); a True cell
+    means the record failed that check.
+    """
+    rows = len(raw[AMOUNT_FIELDS[0]])
+    flags = np.zeros((rows, len(CHECKS)), dtype=bool)
+
+    unparsed_amount = np.zeros(rows, dtype=bool)
+    for field in AMOUNT_FIELDS:
+        unparsed_amount |= (raw[field] != '') & np.isnan(columns[field])
+    unparsed_date = np.zeros(rows, dtype=bool)
+    for field in DATE_FIELDS:
+        unparsed_date |= (raw[field] != '') & np.isnat(columns[field])
+
+    subtotal, tax, total = (columns[field] for field in AMOUNT_FIELDS)
+    # NaN comparisons are False, so checks only fire when every operand parsed
+    with np.errstate(invalid='ignore'):
+        flags[:, 0] = unparsed_amount
+        flags[:, 1] = unparsed_date
+        flags[:, 2] = np.abs(subtotal + tax - total) > AMOUNT_TOLERANCE
+        flags[:, 3] = tax > total
+        flags[:, 4] = total < 0
+    invoice_date, due_date = (columns[field] for field in DATE_FIELDS)
+    flags[:, 5] = due_date < invoice_date
+    return flags
+
+
+def normalize_records(records, day_first=True):
+    # JSON-friendly view: one dict per record with normalized values and the
+    # names of the failed checks
+    raw = to_columns(records)
+    columns = normalize(raw, day_first)
+    flags = validate(raw, columns)
+    amount_lists = {field: columns[field].tolist() for field in AMOUNT_FIELDS}
+    currency_lists = {field: columns[f'{field} Currency'].tolist() for field in AMOUNT_FIELDS}
+    date_lists = {field: np.datetime_as_string(columns[field]).tolist() for field in DATE_FIELDS}
+
+    results = []
+    for index in range(len(records)):
+        normalized = {}
+        for field in AMOUNT_FIELDS:
+            value = amount_lists[field][index]
+            normalized[field] = None if value != value else value
+            normalized[f'{field} Currency'] = currency_lists[field][index]
+        for field in DATE_FIELDS:
+            value = date_lists[field][index]
+            normalized[field] = None if value == 'NaT' else value
+        results.append({
+            'normalized': normalized,
+            'issues': [CHECKS[check] for check in np.flatnonzero(flags[index])],
+        })
+    return results
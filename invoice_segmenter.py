@@ -0,0 +1,71 @@
+import re
+
+# Per-page signals used to find where one invoice ends and the next begins
+INVOICE_NUMBER_RE = re.compile(r'\b(?:Invoice|INV)[ \t]*(?:No\.?|Number|#)?[ \t]*[#:]?[ \t]*([A-Z0-9/-]*\d[A-Z0-9/-]*)', re.I)
+PAGE_NUMBER_RE = re.compile(r'\bPage\s+(\d+)(?:\s*(?:of|/)\s*(\d+))?\b', re.I)
+HEADER_RE = re.compile(r'^\s*(?:TAX\s+)?INVOICE\b', re.I | re.M)
+HEADER_LINES = 8
+
+
+def _page_signals(text):
+    invoice_number = INVOICE_NUMBER_RE.search(text)
+    page_number = PAGE_NUMBER_RE.search(text)
+    header = '\n'.join(text.strip().splitlines()[:HEADER_LINES])
+    return {
+        'invoice_number': invoice_number.group(1).strip('/-').upper() if invoice_number else None,
+        'page_number': int(page_number.group(1)) if page_number else None,
+        'page_total': int(page_number.group(2)) if page_number and page_number.group(2) else None,
+        'has_header': bool(HEADER_RE.search(header)),
+    }
+
+
+def _starts_new_invoice(signals, current):
+    # current holds the signals accumulated for the invoice being built
+    # Once "Page n of n" has been seen the invoice is complete, whatever the
+    # next page says
+    if current['page_total'] and current['pages'] >= current['page_total']:
+        return True
+    if signals['page_number'] is not None:
+        # An explicit "Page 2 of 3" is a continuation whatever else the page says
+        return signals['page_number'] == 1
+    if signals['invoice_number'] and current['invoice_number'] \
+            and signals['invoice_number'] != current['invoice_number']:
+        return True
+    if signals['has_header'] and not signals['invoice_number'] and current['invoice_number']:
+        return True
+    return False
+
+
+def segment_invoices(page_texts):
+    """Split per-page OCR text into invoices.
+
+    Returns a list of dicts with 1-based inclusive 'first_page'/'last_page',
+    the detected 'invoice_number' (or None) and the joined 'text'.
+    """
+    segments = []
+    current = None
+    for page_index, text in enumerate(page_texts, start=1):
+        signals = _page_signals(text)
+        if current is None or _starts_new_invoice(signals, current):
+            current = {
+                'first_page': page_index,
+                'invoice_number': signals['invoice_number'],
+                'page_total': signals['page_total'],
+                'pages': 0,
+                'texts': [],
+            }
+            segments.append(current)
+        current['pages'] += 1
+        current['last_page'] = page_index
+        current['texts'].append(text)
+        if current['invoice_number'] is None:
+            current['invoice_number'] = signals['invoice_number']
+        if current['page_total'] is None:
+            current['page_total'] = signals['page_total']
+
+    return [{
+        'first_page': segment['first_page'],
+        'last_page': segment['last_page'],
+        'invoice_number': segment['invoice_number'],
+        'text': '\n'.join(segment['texts']),
+    } for segment in segments]
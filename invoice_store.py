@@ -0,0 +1,250 @@
+import math
+import os
+import sqlite3
+import threading
+
+from invoice_normalizer import parse_amount, parse_date
+
+DB_PATH = os.environ.get('INVOICE_DB', 'invoices.db')
+
+# Same order as standardFields in the frontend
+STANDARD_FIELDS = [
+    'Invoice Number',
+    'Invoice Date',
+    'Vendor Name',
+    'Vendor Address',
+    'Total Amount',
+    'Tax Amount',
+    'Subtotal',
+    'Due Date',
+    'Purchase Order',
+    'Description'
+]
+FIELD_COLUMNS = {field: field.lower().replace(' ', '_') for field in STANDARD_FIELDS}
+COLUMNS = [FIELD_COLUMNS[field] for field in STANDARD_FIELDS]
+
+MAX_PAGE_SIZE = 500
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS invoices (
+    id INTEGER PRIMARY KEY,
+    owner TEXT NOT NULL,
+    source_hash TEXT NOT NULL,
+    {', '.join(f"{column} TEXT NOT NULL DEFAULT ''" for column in COLUMNS)},
+    amount_value REAL,
+    invoice_date_value TEXT,
+    created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%SZ', 'now')),
+    UNIQUE (owner, source_hash, {', '.join(COLUMNS)})
+);
+CREATE INDEX IF NOT EXISTS idx_invoices_owner ON invoices (owner, id);
+CREATE INDEX IF NOT EXISTS idx_invoices_number ON invoices (owner, invoice_number, id);
+CREATE INDEX IF NOT EXISTS idx_invoices_vendor ON invoices (owner, vendor_name, id);
+CREATE INDEX IF NOT EXISTS idx_invoices_date_value ON invoices (owner, invoice_date_value, id);
+CREATE INDEX IF NOT EXISTS idx_invoices_amount ON invoices (owner, amount_value, id);
+CREATE INDEX IF NOT EXISTS idx_invoices_source_hash ON invoices (owner, source_hash);
+"""
+
+_local = threading.local()
+
+
+def get_connection(db_path=None):
+    # One connection per thread; sqlite3 connections must not be shared
+    db_path = db_path or DB_PATH
+    connections = getattr(_local, 'connections', None)
+    if connections is None:
+        connections = _local.connections = {}
+    conn = connections.get(db_path)
+    if conn is None:
+        conn = sqlite3.connect(db_path)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.executescript(_SCHEMA)
+        connections[db_path] = conn
+    return conn
+
+
+def date_value(text):
+    # ISO YYYY-MM-DD form of an extracted date string, or None if unrecognised.
+    # The raw string is kept alongside for display.
+    value = parse_date(str(text or '').strip())
+    return None if str(value) == 'NaT' else str(value)
+
+
+def amount_value(text):
+    # Numeric total for range queries, e.g. "1.250,00" -> 1250.0, or None if unrecognised
+    value, _ = parse_amount(str(text or '').strip())
+    return None if math.isnan(value) else value
+
+
+def _row_values(record, source_hash, owner):
+    values = [str(record.get(field) or '').strip() for field in STANDARD_FIELDS]
+    return [owner, source_hash] + values + [
+        amount_value(record.get('Total Amount')),
+        date_value(record.get('Invoice Date')),
+    ]
+
+
+_INSERT_SQL = (
+    f"INSERT OR IGNORE INTO invoices (owner, source_hash, {', '.join(COLUMNS)}, amount_value, invoice_date_value) "
+    f"VALUES ({', '.join('?' * (len(COLUMNS) + 4))})"
+)
+
+
+# Every stored invoice belongs to an owner (the frontend's user id), and every
+# read below is scoped to one owner.
+
+
+def save_invoice(record, source_hash, owner, db_path=None):
+    conn = get_connection(db_path)
+    with conn:
+        cursor = conn.execute(_INSERT_SQL, _row_values(record, source_hash, owner))
+        if cursor.rowcount:
+            return cursor.lastrowid, True
+        # Identical record from the same source was already stored
+        placeholders = ' AND '.join(f'{column} = ?' for column in ['owner', 'source_hash'] + COLUMNS)
+        row = conn.execute(
+            f'SELECT id FROM invoices WHERE {placeholders}',
+            _row_values(record, source_hash, owner)[:len(COLUMNS) + 2]
+        ).fetchone()
+        return row['id'], False
+
+
+def save_invoices(records, owner, db_path=None):
+    # Bulk insert of (record, source_hash) pairs in a single transaction
+    conn = get_connection(db_path)
+    with conn:
+        cursor = conn.executemany(
+            _INSERT_SQL, (_row_values(record, source_hash, owner) for record, source_hash in records))
+    return cursor.rowcount
+
+
+def _row_to_record(row):
+    record = {field: row[FIELD_COLUMNS[field]] for field in STANDARD_FIELDS}
+    record['id'] = row['id']
+    record['source_hash'] = row['source_hash']
+    record['created_at'] = row['created_at']
+    return record
+
+
+def _filter_clauses(owner, invoice_number=None, vendor=None, date_from=None, date_to=None,
+                    min_amount=None, max_amount=None, source_hash=None):
+    clauses = ['owner = ?']
+    params = [owner]
+    if invoice_number:
+        clauses.append('invoice_number = ?')
+        params.append(invoice_number)
+    if vendor:
+        clauses.append('vendor_name = ?')
+        params.append(vendor)
+    if date_from:
+        clauses.append('invoice_date_value >= ?')
+        params.append(date_from)
+    if date_to:
+        clauses.append('invoice_date_value <= ?')
+        params.append(date_to)
+    if min_amount is not None:
+        clauses.append('amount_value >= ?')
+        params.append(min_amount)
+    if max_amount is not None:
+        clauses.append('amount_value <= ?')
+        params.append(max_amount)
+    if source_hash:
+        clauses.append('source_hash = ?')
+        params.append(source_hash)
+    return clauses, params
+
+
+def _sort_column(date_from=None, date_to=None, min_amount=None, max_amount=None):
+    # A range filter is served by its (owner, value, id) index only if rows come
+    # back in that index's order; ordering by id instead makes SQLite sort
+    # every matching row on every page
+    if date_from or date_to:
+        return 'invoice_date_value'
+    if min_amount is not None or max_amount is not None:
+        return 'amount_value'
+    return None
+
+
+def _encode_cursor(sort_column, row):
+    if sort_column is None:
+        return str(row['id'])
+    return f"{row[sort_column]}|{row['id']}"
+
+
+def _decode_cursor(sort_column, cursor):
+    # Raises ValueError for a malformed cursor
+    if sort_column is None:
+        return [int(cursor)]
+    value, separator, row_id = str(cursor).rpartition('|')
+    if not separator:
+        raise ValueError('malformed cursor')
+    if sort_column == 'amount_value':
+        return [float(value), int(row_id)]
+    return [value, int(row_id)]
+
+
+def _keyset_clause(sort_column):
+    if sort_column is None:
+        return 'id > ?', 'id'
+    return f'({sort_column}, id) > (?, ?)', f'{sort_column}, id'
+
+
+def query_invoices(owner, invoice_number=None, vendor=None, date_from=None, date_to=None,
+                   min_amount=None, max_amount=None, source_hash=None,
+                   after=None, limit=50, db_path=None):
+    # Keyset pagination: pass the returned next_cursor as `after`. Plain and
+    # equality queries page by id. Date and amount ranges page by (value, id)
+    # in value order, so every page is a bounded index range scan. The cost
+    # stays the same however wide the range or deep the page. date_from/date_to
+    # are ISO (YYYY-MM-DD) and match the normalized invoice_date_value column.
+    clauses, params = _filter_clauses(owner, invoice_number, vendor, date_from, date_to,
+                                      min_amount, max_amount, source_hash)
+    sort_column = _sort_column(date_from, date_to, min_amount, max_amount)
+    keyset, order_by = _keyset_clause(sort_column)
+    if after is not None:
+        clauses.append(keyset)
+        params.extend(_decode_cursor(sort_column, after))
+
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    where = f"WHERE {' AND '.join(clauses)}"
+    rows = get_connection(db_path).execute(
+        f'SELECT * FROM invoices {where} ORDER BY {order_by} LIMIT ?',
+        params + [limit + 1]
+    ).fetchall()
+
+    next_cursor = _encode_cursor(sort_column, rows[limit - 1]) if len(rows) > limit else None
+    return [_row_to_record(row) for row in rows[:limit]], next_cursor
+
+
+def count_invoices(owner, vendor=None, date_from=None, date_to=None, limit=None, db_path=None):
+    # With a limit the scan stops after limit + 1 matches, which is all a
+    # "too many rows?" check needs.
+    clauses, params = _filter_clauses(owner, vendor=vendor, date_from=date_from, date_to=date_to)
+    sql = f"SELECT 1 FROM invoices WHERE {' AND '.join(clauses)}"
+    if limit is not None:
+        sql += ' LIMIT ?'
+        params.append(limit + 1)
+    return get_connection(db_path).execute(f'SELECT COUNT(*) FROM ({sql})', params).fetchone()[0]
+
+
+def iter_invoice_rows(owner, vendor=None, date_from=None, date_to=None, batch_size=5000, db_path=None):
+    # Yields lists of plain tuples in STANDARD_FIELDS order, batch_size rows at
+    # a time. Each batch is a separate keyset query, so no read transaction is
+    # held open for the length of a large export. Date-filtered exports come
+    # out in date order, for the same reason query_invoices pages by value.
+    clauses, params = _filter_clauses(owner, vendor=vendor, date_from=date_from, date_to=date_to)
+    sort_column = _sort_column(date_from, date_to)
+    keyset, order_by = _keyset_clause(sort_column)
+    key_columns = order_by.split(', ')
+    sql = (f"SELECT {', '.join(key_columns + COLUMNS)} FROM invoices "
+           f"WHERE {' AND '.join(clauses + [keyset])} ORDER BY {order_by} LIMIT ?")
+    cursor = get_connection(db_path).cursor()
+    cursor.row_factory = None
+    after = [0] if sort_column is None else ['', 0]
+    while True:
+        rows = cursor.execute(sql, params + after + [batch_size]).fetchall()
+        if not rows:
+            return
+        after = list(rows[-1][:len(key_columns)])
+        yield [row[len(key_columns):] for row in rows]
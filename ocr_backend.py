@@ -1,54 +1,399 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 from google.cloud import vision
 import os
 import mimetypes
 import base64
+import fcntl
+import hashlib
+import json
+import mmap
+import re
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import invoice_store
+from invoice_export import EXPORT_FORMATS, EXPORT_ROW_LIMITS, format_available
+from invoice_normalizer import normalize_records
+from invoice_segmenter import segment_invoices
+from ocr_refine import refine_low_confidence
 
 app = Flask(__name__)
 CORS(app)
 
-@app.route('/api/ocr', methods=['POST'])
-def ocr():
-    if 'file' not in request.files:
-        return jsonify({'error': 'No file uploaded'}), 400
-    file = request.files['file']
-    content = file.read()
-    filename = file.filename
+# Resumable uploads are spooled here; a sidecar JSON file next to each spool
+# holds its metadata so any gunicorn worker can serve any chunk.
+UPLOAD_DIR = os.environ.get('UPLOAD_DIR', os.path.join(tempfile.gettempdir(), 'invoice_uploads'))
+MAX_UPLOAD_SIZE = int(os.environ.get('MAX_UPLOAD_SIZE', 50 * 1024 * 1024))
+CHUNK_READ_SIZE = 64 * 1024
+UPLOAD_ID_RE = re.compile(r'^[0-9a-f]{32}$')
+ISO_DATE_RE = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+OWNER_RE = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+# Uploads with no activity for this long are swept away
+UPLOAD_TTL = int(os.environ.get('UPLOAD_TTL', 24 * 60 * 60))
+
+PDF_PAGES_PER_REQUEST = 5
+OCR_WORKERS = int(os.environ.get('OCR_WORKERS', 8))
+
+
+def _ocr_pdf_pages(client, encoded_pdf, pages, pad_on_error=False):
+    # A failed batch returns no page responses. Later batches are padded with
+    # empty pages so page numbers (and invoice segmentation) stay aligned; the
+    # first batch raises, since without it the page count is unknown.
+    requests = [
+        {
+            "input_config": {
+                "content": encoded_pdf,
+                "mime_type": "application/pdf"
+            },
+            "features": [{"type": vision.Feature.Type.DOCUMENT_TEXT_DETECTION}],
+            "pages": pages
+        }
+    ]
+    response = client.batch_annotate_files(requests=requests)
+    file_response = response.responses[0]
+    if file_response.error.message:
+        if not pad_on_error:
+            raise RuntimeError(f'Vision OCR failed: {file_response.error.message}')
+        app.logger.warning('Vision OCR failed for pages %s: %s', pages, file_response.error.message)
+        return [''] * len(pages), file_response.total_pages
+    texts = [annotation.full_text_annotation.text for annotation in file_response.responses]
+    return texts, file_response.total_pages
+
+
+def extract_pages(content, filename):
+    # content may be bytes or any bytes-like buffer (e.g. an mmap of a spool file).
+    # Returns the OCR text of each page (images are a single page) and the
+    # lines corrected by the low-confidence second pass.
     mime_type, _ = mimetypes.guess_type(filename)
 
     client = vision.ImageAnnotatorClient()
 
     # Check if the file is a PDF
     if mime_type == 'application/pdf' or filename.lower().endswith('.pdf'):
-        # For PDFs, use DOCUMENT_TEXT_DETECTION
+        # For PDFs, use DOCUMENT_TEXT_DETECTION. The synchronous API annotates
+        # at most PDF_PAGES_PER_REQUEST pages per call, so the first call also
+        # tells us the page count and the remaining batches run in parallel.
         encoded_pdf = base64.b64encode(content).decode('utf-8')
-        requests = [
-            {
-                "input_config": {
-                    "content": encoded_pdf,
-                    "mime_type": "application/pdf"
-                },
-                "features": [{"type": vision.Feature.Type.DOCUMENT_TEXT_DETECTION}]
-            }
+        first_texts, total_pages = _ocr_pdf_pages(client, encoded_pdf, list(range(1, PDF_PAGES_PER_REQUEST + 1)))
+        batches = [
+            list(range(first, min(first + PDF_PAGES_PER_REQUEST, total_pages + 1)))
+            for first in range(PDF_PAGES_PER_REQUEST + 1, total_pages + 1, PDF_PAGES_PER_REQUEST)
         ]
-        response = client.batch_annotate_files(requests=requests)
-        # Extract text from the response
-        text = ""
-        for resp in response.responses:
-            for annotation in resp.responses:
-                if annotation.full_text_annotation.text:
-                    text += annotation.full_text_annotation.text
-        return jsonify({'text': text})
+        page_texts = list(first_texts)
+        with ThreadPoolExecutor(max_workers=OCR_WORKERS) as executor:
+            for texts, _ in executor.map(lambda pages: _ocr_pdf_pages(client, encoded_pdf, pages, pad_on_error=True), batches):
+                page_texts.extend(texts)
+        return page_texts, []
     else:
-        # For images, use TEXT_DETECTION
+        # For images, use DOCUMENT_TEXT_DETECTION, which reports per-word
+        # confidences for the second pass. The protobuf field needs real
+        # bytes; bytes() is a no-op when content already is bytes.
+        content = bytes(content)
         image = vision.Image(content=content)
-        response = client.text_detection(image=image)
-        texts = response.text_annotations
-        if not texts:
-            return jsonify({'text': ''})
-        extracted_text = texts[0].description
-        return jsonify({'text': extracted_text})
+        response = client.document_text_detection(image=image)
+        annotation = response.full_text_annotation
+        if not annotation.text:
+            return [''], []
+        text, refinements = refine_low_confidence(client, content, annotation)
+        return [text], refinements
+
+
+def ocr_result(content, filename, digest=None):
+    pages, refinements = extract_pages(content, filename)
+    return {
+        'text': ''.join(pages),
+        'refinements': refinements,
+        'sha256': digest or hashlib.sha256(content).hexdigest(),
+        'page_count': len(pages),
+        'invoices': segment_invoices(pages),
+    }
+
+
+@app.route('/api/ocr', methods=['POST'])
+def ocr():
+    if 'file' not in request.files:
+        return jsonify({'error': 'No file uploaded'}), 400
+    file = request.files['file']
+    content = file.read()
+    return jsonify(ocr_result(content, file.filename))
+
+
+def _upload_paths(upload_id):
+    if not UPLOAD_ID_RE.match(upload_id):
+        return None, None
+    spool_path = os.path.join(UPLOAD_DIR, upload_id + '.part')
+    meta_path = os.path.join(UPLOAD_DIR, upload_id + '.json')
+    if not os.path.exists(meta_path):
+        return None, None
+    return spool_path, meta_path
+
+
+def _load_upload_meta(meta_path):
+    with open(meta_path) as f:
+        return json.load(f)
+
+
+def _remove_upload(spool_path, meta_path):
+    for path in (spool_path, meta_path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def _expire_stale_uploads():
+    # Last activity is the later of creation and the most recent chunk write
+    cutoff = time.time() - UPLOAD_TTL
+    for entry in os.scandir(UPLOAD_DIR):
+        if not entry.name.endswith('.json'):
+            continue
+        meta_path = entry.path
+        spool_path = meta_path[:-len('.json')] + '.part'
+        try:
+            with open(meta_path) as f:
+                created_at = json.load(f).get('created_at', 0)
+        except (OSError, ValueError):
+            created_at = 0
+        try:
+            last_activity = max(created_at, os.path.getmtime(spool_path))
+        except OSError:
+            last_activity = created_at
+        if last_activity < cutoff:
+            _remove_upload(spool_path, meta_path)
+
+
+@app.route('/api/uploads', methods=['POST'])
+def create_upload():
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        data = {}
+    filename = data.get('filename')
+    size = data.get('size')
+    checksum = data.get('sha256')
+    # Validate everything before touching the disk, so a bad request never
+    # leaves a spool file behind
+    if not isinstance(filename, str) or not os.path.basename(filename):
+        return jsonify({'error': 'filename is required'}), 400
+    if checksum is not None and not isinstance(checksum, str):
+        return jsonify({'error': 'sha256 must be a hex digest'}), 400
+    if not isinstance(size, int) or isinstance(size, bool) or size <= 0:
+        return jsonify({'error': 'size must be a positive integer'}), 400
+    if size > MAX_UPLOAD_SIZE:
+        return jsonify({'error': f'File exceeds maximum size of {MAX_UPLOAD_SIZE} bytes'}), 413
+    if checksum is not None and not re.match(r'^[0-9a-fA-F]{64}$', checksum):
+        return jsonify({'error': 'sha256 must be a hex digest'}), 400
+
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    _expire_stale_uploads()
+    upload_id = uuid.uuid4().hex
+    spool_path = os.path.join(UPLOAD_DIR, upload_id + '.part')
+    meta_path = os.path.join(UPLOAD_DIR, upload_id + '.json')
+    open(spool_path, 'xb').close()
+    with open(meta_path, 'w') as f:
+        json.dump({
+            'filename': os.path.basename(filename),
+            'size': size,
+            'sha256': checksum.lower() if checksum else None,
+            'created_at': time.time(),
+        }, f)
+    return jsonify({'upload_id': upload_id, 'offset': 0, 'size': size}), 201
+
+
+@app.route('/api/uploads/<upload_id>', methods=['GET'])
+def upload_status(upload_id):
+    spool_path, meta_path = _upload_paths(upload_id)
+    if spool_path is None:
+        return jsonify({'error': 'Unknown upload'}), 404
+    meta = _load_upload_meta(meta_path)
+    return jsonify({'upload_id': upload_id, 'offset': os.path.getsize(spool_path), 'size': meta['size']})
+
+
+@app.route('/api/uploads/<upload_id>', methods=['PUT'])
+def upload_chunk(upload_id):
+    spool_path, meta_path = _upload_paths(upload_id)
+    if spool_path is None:
+        return jsonify({'error': 'Unknown upload'}), 404
+    meta = _load_upload_meta(meta_path)
+
+    try:
+        offset = int(request.headers.get('Upload-Offset', ''))
+    except ValueError:
+        return jsonify({'error': 'Upload-Offset header is required'}), 400
+    length = request.content_length
+    if length is None:
+        return jsonify({'error': 'Content-Length header is required'}), 411
+    if offset + length > meta['size']:
+        return jsonify({'error': 'Chunk extends past declared file size'}), 400
+
+    # Append-only: a chunk is accepted only if it starts exactly at the
+    # committed offset. The lock keeps concurrent retries of the same chunk
+    # from interleaving.
+    with open(spool_path, 'ab') as spool:
+        fcntl.flock(spool, fcntl.LOCK_EX)
+        committed = os.fstat(spool.fileno()).st_size
+        if offset != committed:
+            return jsonify({'error': 'Offset mismatch', 'offset': committed}), 409
+        remaining = length
+        while remaining > 0:
+            block = request.stream.read(min(CHUNK_READ_SIZE, remaining))
+            if not block:
+                break
+            spool.write(block)
+            remaining -= len(block)
+        spool.flush()
+        os.fsync(spool.fileno())
+        committed = os.fstat(spool.fileno()).st_size
+
+    # A dropped connection leaves a short chunk; the client resumes from here.
+    return jsonify({'upload_id': upload_id, 'offset': committed, 'size': meta['size']})
+
+
+@app.route('/api/uploads/<upload_id>', methods=['DELETE'])
+def abort_upload(upload_id):
+    spool_path, meta_path = _upload_paths(upload_id)
+    if spool_path is None:
+        return jsonify({'error': 'Unknown upload'}), 404
+    _remove_upload(spool_path, meta_path)
+    return '', 204
+
+
+@app.route('/api/uploads/<upload_id>/finalize', methods=['POST'])
+def finalize_upload(upload_id):
+    spool_path, meta_path = _upload_paths(upload_id)
+    if spool_path is None:
+        return jsonify({'error': 'Unknown upload'}), 404
+    meta = _load_upload_meta(meta_path)
+    committed = os.path.getsize(spool_path)
+    if committed != meta['size']:
+        return jsonify({'error': 'Upload incomplete', 'offset': committed, 'size': meta['size']}), 409
+
+    # Map the spool file so hashing reads it in place. OCR still makes one
+    # copy: base64 encoding for PDFs, or bytes() for the Vision image field.
+    with open(spool_path, 'rb') as spool, mmap.mmap(spool.fileno(), 0, access=mmap.ACCESS_READ) as content:
+        digest = hashlib.sha256(content).hexdigest()
+        if meta['sha256'] and digest != meta['sha256']:
+            _remove_upload(spool_path, meta_path)
+            return jsonify({'error': 'Checksum mismatch', 'sha256': digest}), 422
+        result = ocr_result(content, meta['filename'], digest)
+
+    _remove_upload(spool_path, meta_path)
+    return jsonify(result)
+
+
+def _request_owner():
+    # Stored invoices are scoped to the caller's user id. This keeps users'
+    # records apart; it is not authentication.
+    owner = request.headers.get('X-User-Id', '')
+    return owner if OWNER_RE.match(owner) else None
+
+
+@app.route('/api/invoices', methods=['POST'])
+def save_invoice():
+    owner = _request_owner()
+    if owner is None:
+        return jsonify({'error': 'X-User-Id header is required'}), 401
+    data = request.get_json(silent=True) or {}
+    record = data.get('record')
+    source_hash = data.get('source_hash')
+    if not isinstance(record, dict):
+        return jsonify({'error': 'record must be an object'}), 400
+    if not source_hash:
+        return jsonify({'error': 'source_hash is required'}), 400
+    invoice_id, created = invoice_store.save_invoice(record, source_hash, owner)
+    return jsonify({'id': invoice_id, 'created': created}), 201 if created else 200
+
+
+def _invalid_date_args(args):
+    for name in ('date_from', 'date_to'):
+        if name in args and not ISO_DATE_RE.match(args[name]):
+            return jsonify({'error': f'{name} must be an ISO date (YYYY-MM-DD)'}), 400
+    return None
+
+
+@app.route('/api/invoices', methods=['GET'])
+def list_invoices():
+    owner = _request_owner()
+    if owner is None:
+        return jsonify({'error': 'X-User-Id header is required'}), 401
+    args = request.args
+    invalid = _invalid_date_args(args)
+    if invalid:
+        return invalid
+    try:
+        min_amount = float(args['min_amount']) if 'min_amount' in args else None
+        max_amount = float(args['max_amount']) if 'max_amount' in args else None
+        limit = int(args.get('limit', 50))
+    except ValueError:
+        return jsonify({'error': 'min_amount, max_amount and limit must be numeric'}), 400
+    try:
+        records, next_cursor = invoice_store.query_invoices(
+            owner,
+            invoice_number=args.get('invoice_number'),
+            vendor=args.get('vendor'),
+            date_from=args.get('date_from'),
+            date_to=args.get('date_to'),
+            min_amount=min_amount,
+            max_amount=max_amount,
+            source_hash=args.get('source_hash'),
+            after=args.get('after'),
+            limit=limit,
+        )
+    except ValueError:
+        return jsonify({'error': 'after must be a next_cursor returned by a previous page'}), 400
+    return jsonify({'invoices': records, 'next_cursor': next_cursor})
+
+
+@app.route('/api/invoices/validate', methods=['POST'])
+def validate_invoices():
+    data = request.get_json(silent=True) or {}
+    records = data.get('records')
+    if not isinstance(records, list) or not all(isinstance(record, dict) for record in records):
+        return jsonify({'error': 'records must be a list of objects'}), 400
+    day_first = data.get('day_first', True)
+    if not isinstance(day_first, bool):
+        return jsonify({'error': 'day_first must be a boolean'}), 400
+    return jsonify({'results': normalize_records(records, day_first=day_first)})
+
+
+@app.route('/api/invoices/export', methods=['GET'])
+def export_invoices():
+    owner = _request_owner()
+    if owner is None:
+        return jsonify({'error': 'X-User-Id header is required'}), 401
+    args = request.args
+    export_format = args.get('format', 'csv').lower()
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': f"format must be one of {', '.join(EXPORT_FORMATS)}"}), 400
+    if not format_available(export_format):
+        return jsonify({'error': f'{export_format} export is not available on this server'}), 501
+    invalid = _invalid_date_args(args)
+    if invalid:
+        return invalid
+    exporter, mimetype, _ = EXPORT_FORMATS[export_format]
+    filters = {
+        'vendor': args.get('vendor'),
+        'date_from': args.get('date_from'),
+        'date_to': args.get('date_to'),
+    }
+
+    # Formats that are built in full before the first byte get a row cap
+    row_limit = EXPORT_ROW_LIMITS.get(export_format)
+    if row_limit is not None and invoice_store.count_invoices(owner, limit=row_limit, **filters) > row_limit:
+        return jsonify({
+            'error': f'{export_format} export is limited to {row_limit} rows; '
+                     'narrow the date range or use csv or parquet'
+        }), 413
+
+    batches = invoice_store.iter_invoice_rows(owner, **filters)
+    return Response(
+        stream_with_context(exporter(batches)),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename=invoices.{export_format}'},
+    )
+
 
 if __name__ == '__main__':
     app.run(host="0.0.0.0", port=5000)
@@ -0,0 +1,159 @@
+import io
+import logging
+import re
+
+from google.cloud import vision
+from PIL import Image, ImageOps
+
+# Words below this confidence on a key line are re-read
+LOW_CONFIDENCE = 0.8
+# Lines that carry the fields we care most about
+KEY_LINE_RE = re.compile(r'total|tax|vat|subtotal|amount|invoice\s*(?:no|number|#)|inv\b|date|due', re.I)
+UPSCALE = 2
+PADDING = 8
+GAP = 40
+MAX_REGIONS = 12
+
+logger = logging.getLogger(__name__)
+
+BREAKS = {
+    vision.TextAnnotation.DetectedBreak.BreakType.SPACE: ' ',
+    vision.TextAnnotation.DetectedBreak.BreakType.SURE_SPACE: ' ',
+    vision.TextAnnotation.DetectedBreak.BreakType.EOL_SURE_SPACE: '\n',
+    vision.TextAnnotation.DetectedBreak.BreakType.HYPHEN: '-\n',
+    vision.TextAnnotation.DetectedBreak.BreakType.LINE_BREAK: '\n',
+}
+
+
+def _box(bounding_box):
+    xs = [vertex.x for vertex in bounding_box.vertices]
+    ys = [vertex.y for vertex in bounding_box.vertices]
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def _words(annotation):
+    # Flatten the page/block/paragraph/word tree in reading order
+    words = []
+    for page in annotation.pages:
+        for block in page.blocks:
+            for paragraph in block.paragraphs:
+                for word in paragraph.words:
+                    last = word.symbols[-1] if word.symbols else None
+                    words.append({
+                        'text': ''.join(symbol.text for symbol in word.symbols),
+                        'break': BREAKS.get(last.property.detected_break.type_, '') if last else '',
+                        'confidence': word.confidence,
+                        'box': _box(word.bounding_box),
+                    })
+    return words
+
+
+def _lines(words):
+    # Group words whose vertical centres share a band. Values often sit in a
+    # separate block from their label, so this deliberately ignores blocks.
+    lines = []
+    for index in sorted(range(len(words)), key=lambda i: (words[i]['box'][1] + words[i]['box'][3]) / 2):
+        left, top, right, bottom = words[index]['box']
+        centre = (top + bottom) / 2
+        if lines and lines[-1]['top'] <= centre <= lines[-1]['bottom']:
+            lines[-1]['words'].append(index)
+        else:
+            lines.append({'top': top, 'bottom': bottom, 'words': [index]})
+    for line in lines:
+        line['words'].sort(key=lambda i: words[i]['box'][0])
+    return lines
+
+
+def _key_regions(words):
+    regions = []
+    for line in _lines(words):
+        text = ' '.join(words[i]['text'] for i in line['words'])
+        if not KEY_LINE_RE.search(text):
+            continue
+        if min(words[i]['confidence'] for i in line['words']) >= LOW_CONFIDENCE:
+            continue
+        boxes = [words[i]['box'] for i in line['words']]
+        regions.append({
+            'words': line['words'],
+            'box': (min(b[0] for b in boxes), min(b[1] for b in boxes),
+                    max(b[2] for b in boxes), max(b[3] for b in boxes)),
+        })
+    # Worst lines first when there are more than one composite can hold
+    regions.sort(key=lambda region: min(words[i]['confidence'] for i in region['words']))
+    return regions[:MAX_REGIONS]
+
+
+def _composite(image, regions):
+    # Crop, upscale and stack every region into one image, so all of them are
+    # re-read by a single Vision request billed as one unit
+    crops = []
+    for region in regions:
+        left, top, right, bottom = region['box']
+        crop = image.crop((max(left - PADDING, 0), max(top - PADDING, 0),
+                           min(right + PADDING, image.width), min(bottom + PADDING, image.height)))
+        crop = crop.resize((crop.width * UPSCALE, crop.height * UPSCALE), Image.LANCZOS)
+        crops.append(ImageOps.autocontrast(crop.convert('L')))
+
+    composite = Image.new('L', (max(crop.width for crop in crops),
+                                sum(crop.height for crop in crops) + GAP * (len(crops) + 1)), 255)
+    offset = GAP
+    for region, crop in zip(regions, crops):
+        composite.paste(crop, (0, offset))
+        region['band'] = (offset, offset + crop.height)
+        offset += crop.height + GAP
+
+    buffer = io.BytesIO()
+    composite.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def refine_low_confidence(client, content, annotation):
+    """Re-OCR low-confidence words on key lines (totals, tax, invoice number, dates).
+
+    Returns the possibly corrected text and a list of {'before', 'after'}
+    line replacements. Without candidates no extra request is made. This pass
+    is best-effort: if the image cannot be decoded or the re-read fails, the
+    first-pass text is returned unchanged.
+    """
+    words = _words(annotation)
+    regions = _key_regions(words)
+    if not regions:
+        return annotation.text, []
+
+    try:
+        # Vision accepts formats Pillow cannot decode (RAW, some TIFF/ICO)
+        image = Image.open(io.BytesIO(content))
+        response = client.document_text_detection(image=vision.Image(content=_composite(image, regions)))
+    except Exception:
+        logger.warning('Low-confidence re-OCR skipped', exc_info=True)
+        return annotation.text, []
+    if response.error.message:
+        logger.warning('Low-confidence re-OCR failed: %s', response.error.message)
+        return annotation.text, []
+    reread = _words(response.full_text_annotation)
+
+    refinements = []
+    for region in regions:
+        top, bottom = region['band']
+        candidates = sorted(
+            (word for word in reread if top <= (word['box'][1] + word['box'][3]) / 2 <= bottom),
+            key=lambda word: word['box'][0],
+        )
+        # Only splice word-for-word; a different word count means the two
+        # readings cannot be aligned reliably
+        if len(candidates) != len(region['words']):
+            continue
+        original_confidence = sum(words[i]['confidence'] for i in region['words']) / len(region['words'])
+        reread_confidence = sum(word['confidence'] for word in candidates) / len(candidates)
+        if reread_confidence <= original_confidence:
+            continue
+        before = ' '.join(words[i]['text'] for i in region['words'])
+        for index, word in zip(region['words'], candidates):
+            words[index]['text'] = word['text']
+        after = ' '.join(words[i]['text'] for i in region['words'])
+        if after != before:
+            refinements.append({'before': before, 'after': after})
+
+    if not refinements:
+        return annotation.text, []
+    return ''.join(word['text'] + word['break'] for word in words), refinements
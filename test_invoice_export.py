@@ -0,0 +1,83 @@
+import csv
+import io
+
+import pytest
+
+import invoice_export
+import invoice_store
+import ocr_backend
+from invoice_export import export_csv, export_parquet, export_xlsx
+from invoice_store import STANDARD_FIELDS
+
+
+def row(**values):
+    return tuple(values.get(field, '') for field in STANDARD_FIELDS)
+
+
+ROWS = [row(**{'Invoice Number': 'INV-1', 'Total Amount': '=1+1', 'Tax Amount': '+2', 'Subtotal': '-3',
+               'Vendor Name': '@SUM(A1)', 'Description': '=HYPERLINK("http://x","1")'})]
+
+
+def test_csv_header_and_rows():
+    data = b''.join(export_csv([[row(**{'Invoice Number': 'INV-1', 'Vendor Name': 'Acme, Ltd'})]]))
+    header, record = list(csv.reader(io.StringIO(data.decode('utf-8'))))
+    assert header == STANDARD_FIELDS
+    assert record[0] == 'INV-1'
+    assert record[2] == 'Acme, Ltd'
+
+
+def test_csv_neutralises_formulas():
+    data = b''.join(export_csv([ROWS]))
+    record = dict(zip(STANDARD_FIELDS, list(csv.reader(io.StringIO(data.decode('utf-8'))))[1]))
+    assert record['Total Amount'] == "'=1+1"
+    assert record['Tax Amount'] == "'+2"
+    assert record['Subtotal'] == "'-3"
+    assert record['Vendor Name'] == "'@SUM(A1)"
+    assert record['Invoice Number'] == 'INV-1'
+
+
+def test_xlsx_writes_formulas_as_text():
+    openpyxl = pytest.importorskip('openpyxl')
+    workbook = openpyxl.load_workbook(io.BytesIO(b''.join(export_xlsx([ROWS]))))
+    header, cells = list(workbook['Invoices'].iter_rows())
+    assert [cell.value for cell in header] == STANDARD_FIELDS
+    record = dict(zip(STANDARD_FIELDS, cells))
+    assert record['Total Amount'].value == '=1+1'
+    assert record['Total Amount'].data_type == 's'
+    assert record['Description'].data_type == 's'
+    assert all(cell.data_type != 'f' for cell in cells)
+
+
+def test_xlsx_refuses_rows_over_the_limit(monkeypatch):
+    pytest.importorskip('openpyxl')
+    monkeypatch.setattr(invoice_export, 'XLSX_MAX_ROWS', 1)
+    with pytest.raises(ValueError):
+        b''.join(export_xlsx([ROWS * 2]))
+
+
+def test_parquet_streams_each_row_group():
+    pq = pytest.importorskip('pyarrow.parquet')
+    batches = [[row(**{'Invoice Number': f'INV-{i}'}) for i in range(start, start + 3)] for start in (0, 3)]
+    chunks = []
+    for chunk in export_parquet(iter(batches)):
+        chunks.append(chunk)
+        if len(chunks) == 1:
+            assert chunk.startswith(b'PAR1')
+    table = pq.read_table(io.BytesIO(b''.join(chunks)))
+    assert table.column('Invoice Number').to_pylist() == [f'INV-{i}' for i in range(6)]
+    assert len(chunks) == 3
+
+
+def test_export_endpoint_caps_xlsx_rows(tmp_path, monkeypatch):
+    pytest.importorskip('openpyxl')
+    monkeypatch.setattr(invoice_store, 'DB_PATH', str(tmp_path / 'invoices.db'))
+    monkeypatch.setitem(invoice_export.EXPORT_ROW_LIMITS, 'xlsx', 1)
+    for number in ('A1', 'A2'):
+        invoice_store.save_invoice({'Invoice Number': number}, 'h', 'alice')
+    client = ocr_backend.app.test_client()
+
+    response = client.get('/api/invoices/export?format=xlsx', headers={'X-User-Id': 'alice'})
+    assert response.status_code == 413
+    response = client.get('/api/invoices/export?format=csv', headers={'X-User-Id': 'alice'})
+    assert response.status_code == 200
+    assert response.data.count(b'\n') == 3
@@ -0,0 +1,118 @@
+import math
+
+import numpy as np
+import pytest
+
+import invoice_normalizer
+from invoice_normalizer import (CHECKS, _number_from_digits, normalize_records, parse_amount,
+                                parse_amount_column, parse_date)
+
+
+AMOUNT_CASES = [
+    ('KES 1,250.00', (1250.0, 'KES')),
+    ('KSh 500', (500.0, 'KES')),
+    ('KES1,250.00', (1250.0, 'KES')),
+    ('KSh1,250', (1250.0, 'KES')),
+    ('USD1,000', (1000.0, 'USD')),
+    ('-KES1,250.00', (-1250.0, 'KES')),
+    ('USDT 5', (5.0, '')),
+    ('$12.50', (12.5, 'USD')),
+    ('1 250,50 €', (1250.5, 'EUR')),
+    ('-1,250.00', (-1250.0, '')),
+    ('KES -1,250.00', (-1250.0, 'KES')),
+    ('-$12', (-12.0, 'USD')),
+    ('(45.00)', (-45.0, '')),
+    ('(KES 45.00)', (-45.0, 'KES')),
+    ('Sub-total 1,000.00', (1000.0, '')),
+    ('Amount (KES): 1,250.00', (1250.0, 'KES')),
+    ('Total: 1,250.00 (16% VAT)', (1250.0, '')),
+    ('1,250.00 KES', (1250.0, 'KES')),
+    ('1,250.00KES', (1250.0, '')),
+    ('5 $', (5.0, 'USD')),
+    ('--5', (-5.0, '')),
+]
+
+
+@pytest.mark.parametrize('text, expected', AMOUNT_CASES)
+def test_parse_amount(text, expected):
+    assert parse_amount(text) == expected
+
+
+@pytest.mark.parametrize('has_pyarrow', [True, False])
+def test_parse_amount_column_matches_parse_amount(monkeypatch, has_pyarrow):
+    if has_pyarrow:
+        pytest.importorskip('pyarrow')
+    monkeypatch.setattr(invoice_normalizer, 'HAS_PYARROW', has_pyarrow)
+    texts = [text for text, _ in AMOUNT_CASES] + ['n/a', '', '1.250.000', '(45.00)']
+    values, currencies = parse_amount_column(np.array(texts, dtype=str))
+    for text, value, currency in zip(texts, values, currencies):
+        expected_value, expected_currency = parse_amount(text)
+        assert (value == expected_value or math.isnan(value) and math.isnan(expected_value)), text
+        assert currency == expected_currency, text
+
+
+def test_parse_amount_unparseable():
+    value, currency = parse_amount('n/a')
+    assert math.isnan(value)
+    assert currency == ''
+
+
+@pytest.mark.parametrize('digits, expected', [
+    ('1,250.00', 1250.0),
+    ('1.250,00', 1250.0),
+    ('1 250,50', 1250.5),
+    ("1'250.75", 1250.75),
+    ('1,250', 1250.0),
+    ('1.250.000', 1250000.0),
+    ('1250,5', 1250.5),
+    ('12.50', 12.5),
+    ('1.250', 1.25),
+    ('1,250,000.10', 1250000.1),
+])
+def test_number_from_digits_locales(digits, expected):
+    assert _number_from_digits(digits) == expected
+
+
+@pytest.mark.parametrize('text, day_first, expected', [
+    ('2025-03-04', True, '2025-03-04'),
+    ('03/04/25', True, '2025-04-03'),
+    ('03/04/25', False, '2025-03-04'),
+    ('13/04/2025', False, '2025-04-13'),
+    ('04.03.2025', True, '2025-03-04'),
+    ('4 March 2025', True, '2025-03-04'),
+    ('March 4th, 2025', True, '2025-03-04'),
+    ('04-Mar-25', True, '2025-03-04'),
+    ('Invoice Date: 1st Jan 99', True, '1999-01-01'),
+])
+def test_parse_date(text, day_first, expected):
+    assert str(parse_date(text, day_first)) == expected
+
+
+@pytest.mark.parametrize('text', ['31/02/2025', 'soon', ''])
+def test_parse_date_invalid(text):
+    assert np.isnat(parse_date(text))
+
+
+def test_normalize_records_flags_cross_field_failures():
+    results = normalize_records([
+        {'Subtotal': '1,000.00', 'Tax Amount': '160.00', 'Total Amount': 'KES 1,160.00',
+         'Invoice Date': '01/03/2025', 'Due Date': '31/03/2025'},
+        {'Subtotal': '1.000,00', 'Tax Amount': '160,00', 'Total Amount': '1.200,00',
+         'Invoice Date': '05/03/2025', 'Due Date': '01/03/2025'},
+        {'Subtotal': 'Sub-total 1,000.00', 'Tax Amount': '0', 'Total Amount': 'Total (KES) 1,000.00'},
+        {'Total Amount': 'n/a', 'Invoice Date': 'soon'},
+        {},
+    ])
+    assert results[0]['issues'] == []
+    assert results[0]['normalized']['Total Amount'] == 1160.0
+    assert results[0]['normalized']['Invoice Date'] == '2025-03-01'
+    assert results[1]['issues'] == ['subtotal_tax_total_mismatch', 'due_before_invoice_date']
+    assert results[2]['issues'] == []
+    assert results[3]['issues'] == ['unparsed_amount', 'unparsed_date']
+    assert results[3]['normalized']['Total Amount'] is None
+    assert results[4]['issues'] == []
+    assert set(issue for result in results for issue in result['issues']) <= set(CHECKS)
+
+
+def test_normalize_records_empty_batch():
+    assert normalize_records([]) == []
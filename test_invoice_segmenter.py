@@ -0,0 +1,73 @@
+from invoice_segmenter import segment_invoices
+
+
+def spans(segments):
+    return [(segment['first_page'], segment['last_page'], segment['invoice_number']) for segment in segments]
+
+
+def test_single_page_invoice():
+    segments = segment_invoices(['ACME Company\nInvoice No: A-100\nTotal: 50.00'])
+    assert spans(segments) == [(1, 1, 'A-100')]
+    assert segments[0]['text'] == 'ACME Company\nInvoice No: A-100\nTotal: 50.00'
+
+
+def test_empty_document():
+    assert segment_invoices([]) == []
+
+
+def test_page_number_reset_starts_new_invoice():
+    pages = [
+        'Invoice No: A-100\nPage 1 of 2',
+        'Line items continued\nPage 2 of 2',
+        'Invoice No: B-200\nPage 1 of 1',
+    ]
+    assert spans(segment_invoices(pages)) == [(1, 2, 'A-100'), (3, 3, 'B-200')]
+
+
+def test_page_one_without_total_starts_new_invoice():
+    pages = ['Invoice No: A-100\nPage 1', 'more items\nPage 2', 'Acme Ltd\nPage 1']
+    assert spans(segment_invoices(pages)) == [(1, 2, 'A-100'), (3, 3, None)]
+
+
+def test_exhausted_page_count_starts_new_invoice():
+    # The next page carries no page marker, but "Page 2 of 2" closed the previous invoice
+    pages = ['Invoice No: A-100\nPage 1 of 2', 'Page 2 of 2', 'Acme Ltd\nTotal: 10.00']
+    assert spans(segment_invoices(pages)) == [(1, 2, 'A-100'), (3, 3, None)]
+
+
+def test_invoice_number_change_starts_new_invoice():
+    pages = [
+        'TAX INVOICE\nInvoice #: B-7\nTotal: 5',
+        'more lines for Invoice #: B-7',
+        'Invoice: C-9\nTotal: 7',
+        'INV-2024-55 Total',
+    ]
+    assert spans(segment_invoices(pages)) == [(1, 2, 'B-7'), (3, 3, 'C-9'), (4, 4, '2024-55')]
+
+
+def test_header_without_number_starts_new_invoice():
+    pages = ['Invoice No: A-100\nTotal: 5', 'INVOICE\nDate: 2025-01-01', 'Total due: 12.00']
+    assert spans(segment_invoices(pages)) == [(1, 1, 'A-100'), (2, 3, None)]
+
+
+def test_later_page_fills_in_missing_invoice_number():
+    pages = ['INVOICE\nAcme Ltd', 'Invoice No: D-4\nTotal: 9']
+    assert spans(segment_invoices(pages)) == [(1, 2, 'D-4')]
+
+
+def test_explicit_continuation_wins_over_invoice_number_change():
+    # "Page 2 of 3" is a continuation even if OCR reads a different invoice
+    # number on it (e.g. a referenced credit note or a misread digit)
+    pages = [
+        'Invoice No: A-100\nPage 1 of 3',
+        'Ref Invoice No: Z-999\nPage 2 of 3',
+        'Invoice No: A-100\nPage 3 of 3',
+    ]
+    assert spans(segment_invoices(pages)) == [(1, 3, 'A-100')]
+
+
+def test_header_detection_ignores_body_lines():
+    # "INVOICE" deep in the page body is not a header
+    body = '\n'.join(['Acme Ltd'] + ['item'] * 10 + ['INVOICE'])
+    pages = ['Invoice No: A-100\nTotal: 5', body]
+    assert spans(segment_invoices(pages)) == [(1, 2, 'A-100')]
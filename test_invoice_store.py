@@ -0,0 +1,91 @@
+import pytest
+
+import invoice_store
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / 'invoices.db')
+
+
+def numbers(records):
+    return [record['Invoice Number'] for record in records]
+
+
+def test_save_is_idempotent(db_path):
+    record = {'Invoice Number': 'A1', 'Vendor Name': 'Acme'}
+    first = invoice_store.save_invoice(record, 'hash', 'alice', db_path=db_path)
+    second = invoice_store.save_invoice(record, 'hash', 'alice', db_path=db_path)
+    assert first == (first[0], True)
+    assert second == (first[0], False)
+
+
+def test_queries_are_scoped_to_owner(db_path):
+    invoice_store.save_invoice({'Invoice Number': 'A1'}, 'hash', 'alice', db_path=db_path)
+    invoice_store.save_invoice({'Invoice Number': 'A1'}, 'hash', 'bob', db_path=db_path)
+    records, _ = invoice_store.query_invoices('alice', invoice_number='A1', db_path=db_path)
+    assert len(records) == 1
+    assert invoice_store.query_invoices('carol', db_path=db_path) == ([], None)
+    assert list(invoice_store.iter_invoice_rows('carol', db_path=db_path)) == []
+
+
+def test_date_range_uses_normalized_dates(db_path):
+    invoice_store.save_invoice({'Invoice Number': 'APR', 'Invoice Date': '03/04/25'}, 'h', 'alice', db_path=db_path)
+    invoice_store.save_invoice({'Invoice Number': 'MAR', 'Invoice Date': '4 March 2025'}, 'h', 'alice', db_path=db_path)
+    records, _ = invoice_store.query_invoices('alice', date_from='2025-04-01', date_to='2025-04-30', db_path=db_path)
+    assert numbers(records) == ['APR']
+    assert records[0]['Invoice Date'] == '03/04/25'
+
+
+def test_amount_range_uses_locale_aware_amounts(db_path):
+    for number, total in [('EU', '1.250,00'), ('SPACE', '1 250,00'), ('VAT', 'Total: 1,250.00 (16% VAT)'),
+                          ('SMALL', '12.50')]:
+        invoice_store.save_invoice({'Invoice Number': number, 'Total Amount': total}, 'h', 'alice', db_path=db_path)
+    records, _ = invoice_store.query_invoices('alice', min_amount=1000, max_amount=1300, db_path=db_path)
+    assert sorted(numbers(records)) == ['EU', 'SPACE', 'VAT']
+
+
+@pytest.mark.parametrize('filters', [
+    {},
+    {'min_amount': 100, 'max_amount': 800},
+    {'date_from': '2025-02-01', 'date_to': '2025-11-30'},
+])
+def test_pagination_returns_each_match_once(db_path, filters):
+    records = [({'Invoice Number': f'INV-{i}',
+                 'Invoice Date': f'2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}',
+                 # Repeated amounts exercise the id tie-breaker in the cursor
+                 'Total Amount': f'{(i * 37) % 1000 // 10 * 10}.00'}, f'{i}') for i in range(300)]
+    invoice_store.save_invoices(records, 'alice', db_path=db_path)
+    expected, _ = invoice_store.query_invoices('alice', limit=500, db_path=db_path, **filters)
+
+    seen = []
+    cursor = None
+    while True:
+        page, cursor = invoice_store.query_invoices('alice', after=cursor, limit=7, db_path=db_path, **filters)
+        seen.extend(numbers(page))
+        if cursor is None:
+            break
+    assert seen == numbers(expected)
+    assert len(seen) == len(set(seen))
+
+
+def test_date_filtered_export_is_in_date_order(db_path):
+    for number, date in [('B', '2025-03-02'), ('A', '2025-03-01'), ('C', '2025-03-03'), ('X', '2025-04-01')]:
+        invoice_store.save_invoice({'Invoice Number': number, 'Invoice Date': date}, 'h', 'alice', db_path=db_path)
+    batches = invoice_store.iter_invoice_rows('alice', date_from='2025-03-01', date_to='2025-03-31',
+                                              batch_size=2, db_path=db_path)
+    assert [row[0] for batch in batches for row in batch] == ['A', 'B', 'C']
+
+
+def test_count_stops_at_limit(db_path):
+    for number in range(5):
+        invoice_store.save_invoice({'Invoice Number': str(number)}, 'h', 'alice', db_path=db_path)
+    assert invoice_store.count_invoices('alice', db_path=db_path) == 5
+    assert invoice_store.count_invoices('alice', limit=2, db_path=db_path) == 3
+    assert invoice_store.count_invoices('bob', db_path=db_path) == 0
+
+
+@pytest.mark.parametrize('filters, cursor', [({}, 'abc'), ({'min_amount': 1}, 'abc'), ({'date_from': '2025-01-01'}, '5')])
+def test_malformed_cursor(db_path, filters, cursor):
+    with pytest.raises(ValueError):
+        invoice_store.query_invoices('alice', after=cursor, db_path=db_path, **filters)
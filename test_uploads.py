@@ -0,0 +1,118 @@
+import hashlib
+import json
+import os
+import time
+
+import pytest
+
+import ocr_backend
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(ocr_backend, 'UPLOAD_DIR', str(tmp_path))
+    # Finalize hands the mapped spool to OCR; record what it saw instead of calling Vision
+    monkeypatch.setattr(ocr_backend, 'ocr_result',
+                        lambda content, filename, digest=None: {'text': bytes(content).decode(), 'sha256': digest})
+    return ocr_backend.app.test_client()
+
+
+def create(client, data=b'hello world', **extra):
+    response = client.post('/api/uploads', json={'filename': 'scan.png', 'size': len(data), **extra})
+    assert response.status_code == 201
+    return response.json['upload_id']
+
+
+def put(client, upload_id, offset, chunk):
+    return client.put(f'/api/uploads/{upload_id}', data=chunk, headers={'Upload-Offset': str(offset)})
+
+
+def test_chunks_assemble_and_finalize(client, tmp_path):
+    data = b'hello world'
+    upload_id = create(client, data, sha256=hashlib.sha256(data).hexdigest())
+    assert put(client, upload_id, 0, data[:5]).json['offset'] == 5
+    assert put(client, upload_id, 5, data[5:]).json['offset'] == len(data)
+
+    response = client.post(f'/api/uploads/{upload_id}/finalize')
+    assert response.status_code == 200
+    assert response.json['text'] == 'hello world'
+    assert os.listdir(tmp_path) == []
+
+
+def test_offset_mismatch_returns_committed_offset(client):
+    upload_id = create(client)
+    put(client, upload_id, 0, b'hello')
+    response = put(client, upload_id, 0, b'hello')
+    assert response.status_code == 409
+    assert response.json['offset'] == 5
+
+
+def test_short_chunk_resumes_from_committed_offset(client):
+    data = b'hello world'
+    upload_id = create(client, data)
+    # Simulate a connection that dropped after 3 of 6 bytes reached the server
+    with open(os.path.join(ocr_backend.UPLOAD_DIR, upload_id + '.part'), 'ab') as spool:
+        spool.write(data[:3])
+
+    assert client.get(f'/api/uploads/{upload_id}').json['offset'] == 3
+    assert put(client, upload_id, 3, data[3:]).json['offset'] == len(data)
+    assert client.post(f'/api/uploads/{upload_id}/finalize').json['text'] == 'hello world'
+
+
+def test_chunk_past_declared_size_is_rejected(client):
+    upload_id = create(client, b'abc')
+    assert put(client, upload_id, 0, b'abcd').status_code == 400
+
+
+def test_incomplete_finalize(client):
+    upload_id = create(client)
+    put(client, upload_id, 0, b'hello')
+    response = client.post(f'/api/uploads/{upload_id}/finalize')
+    assert response.status_code == 409
+    assert response.json['offset'] == 5
+
+
+def test_checksum_mismatch(client, tmp_path):
+    upload_id = create(client, sha256='0' * 64)
+    put(client, upload_id, 0, b'hello world')
+    response = client.post(f'/api/uploads/{upload_id}/finalize')
+    assert response.status_code == 422
+    assert response.json['sha256'] == hashlib.sha256(b'hello world').hexdigest()
+    assert os.listdir(tmp_path) == []
+
+
+@pytest.mark.parametrize('body', [
+    {'filename': 123, 'size': 5},
+    {'filename': 'scan.png', 'size': 5, 'sha256': 123},
+    {'filename': 'scan.png', 'size': True},
+    {'filename': 'scan.png', 'size': 0},
+    ['not', 'an', 'object'],
+])
+def test_invalid_create_leaves_no_files(client, tmp_path, body):
+    assert client.post('/api/uploads', json=body).status_code == 400
+    assert os.listdir(tmp_path) == []
+
+
+def test_unknown_upload(client):
+    assert client.get('/api/uploads/' + '0' * 32).status_code == 404
+    assert client.get('/api/uploads/../../etc').status_code == 404
+
+
+def test_stale_uploads_expire(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(ocr_backend, 'UPLOAD_TTL', 60)
+    stale = create(client)
+    fresh = create(client)
+    put(client, fresh, 0, b'hello')
+
+    old = time.time() - 120
+    os.utime(os.path.join(tmp_path, stale + '.part'), (old, old))
+    meta_path = os.path.join(tmp_path, stale + '.json')
+    with open(meta_path) as f:
+        meta = json.load(f)
+    meta['created_at'] = old
+    with open(meta_path, 'w') as f:
+        json.dump(meta, f)
+
+    create(client)
+    assert client.get(f'/api/uploads/{stale}').status_code == 404
+    assert client.get(f'/api/uploads/{fresh}').json['offset'] == 5